@@ -69,9 +69,9 @@ async function extractVideoIds() {
   console.log('─'.repeat(70));
   console.log(`\nInstall yt-dlp: pip install yt-dlp`);
   console.log(`\nThen extract video IDs:`);
-  console.log(`  yt-dlp --dump-json --flat-playlist "${PLAYLISTS[0]?.url}" | jq -r '.entries[].id'`);
-  console.log(`  yt-dlp --dump-json --flat-playlist "${PLAYLISTS[1]?.url}" | jq -r '.entries[].id'`);
-  console.log(`  yt-dlp --dump-json --flat-playlist "${PLAYLISTS[2]?.url}" | jq -r '.entries[].id'`);
+  console.log(`  yt-dlp --dump-single-json --flat-playlist "${PLAYLISTS[0]?.url}" | jq -r '.entries[].id'`);
+  console.log(`  yt-dlp --dump-single-json --flat-playlist "${PLAYLISTS[1]?.url}" | jq -r '.entries[].id'`);
+  console.log(`  yt-dlp --dump-single-json --flat-playlist "${PLAYLISTS[2]?.url}" | jq -r '.entries[].id'`);
 
   console.log('\n' + '═'.repeat(70));
   console.log('🚀 Once you have the video IDs:');
@@ -9,10 +9,33 @@ Usage:
   python3 scripts/extract-youtube-ids.py
 """
 
-import json
+import os
+import signal
 import subprocess
 import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
+
+# orjson is optional; fall back to the stdlib json module
+try:
+    import orjson
+
+    def _dumpb(obj, pretty: bool = False) -> bytes:
+        """Serialize to UTF-8 JSON bytes (compact unless pretty)"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumpb(obj, pretty: bool = False) -> bytes:
+        """Serialize to UTF-8 JSON bytes (compact unless pretty)"""
+        return json.dumps(obj, indent=2 if pretty else None).encode()
+
+    _loads = json.loads
 
 PLAYLISTS = {
     "if-i-could-go-back": {
@@ -39,42 +62,81 @@ def check_ytdlp():
         return False
 
 
-def extract_playlist_videos(playlist_url: str) -> list[dict]:
-    """Extract video IDs and titles from a YouTube playlist"""
-    try:
-        result = subprocess.run(
-            [
-                "yt-dlp",
-                "--dump-json",
-                "--flat-playlist",
-                "--no-warnings",
-                playlist_url,
-            ],
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
-
-        if result.returncode != 0:
-            print(f"Error: {result.stderr}")
-            return []
-
-        data = json.loads(result.stdout)
-        videos = []
-
-        for entry in data.get("entries", []):
-            videos.append({"id": entry["id"], "title": entry.get("title", f"Episode {len(videos) + 1}")})
+def extract_playlist_videos(playlist_url: str, timeout: float = 60) -> tuple[list[dict], Optional[str]]:
+    """Extract video IDs and titles from a YouTube playlist
+
+    Returns (videos, error). Nothing is printed here: this runs on worker
+    threads, so the caller prints any error with the rest of the playlist's
+    buffered output.
+
+    Only the id and title fields are requested via --print (one tab-separated
+    line per entry), avoiding yt-dlp's full per-entry JSON dump. stdout is
+    parsed line by line as it arrives instead of buffered whole. stderr goes
+    to a temp file so a chatty yt-dlp can't fill an unread pipe and block,
+    and a timer kills the process if it runs past the deadline.
+    """
+    with tempfile.TemporaryFile(mode="w+") as stderr_file:
+        try:
+            proc = subprocess.Popen(
+                [
+                    "yt-dlp",
+                    "--flat-playlist",
+                    "--no-warnings",
+                    "--print",
+                    "%(id)s\t%(title)s",
+                    playlist_url,
+                ],
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                text=True,
+                # Own process group, so a timeout also kills any children
+                # still holding stdout open
+                start_new_session=True,
+            )
+        except Exception as e:
+            return [], f"Error extracting playlist: {e}"
+
+        # Deadline covers reading stdout, not just waiting for exit
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (AttributeError, OSError):
+                proc.kill()
+
+        timer = threading.Timer(timeout, kill_on_timeout)
+        timer.start()
 
-        return videos
-    except json.JSONDecodeError:
-        print("Error decoding JSON response from yt-dlp")
-        return []
-    except subprocess.TimeoutExpired:
-        print(f"Timeout extracting playlist: {playlist_url}")
-        return []
-    except Exception as e:
-        print(f"Error extracting playlist: {e}")
-        return []
+        videos = []
+        try:
+            for line in proc.stdout:
+                video_id, _, title = line.rstrip("\n").partition("\t")
+                if not video_id:
+                    continue
+                # yt-dlp prints "NA" for fields missing from the flat entry
+                if not title or title == "NA":
+                    title = f"Episode {len(videos) + 1}"
+                videos.append({"id": video_id, "title": title})
+
+            proc.wait()
+        except Exception as e:
+            proc.kill()
+            proc.wait()
+            return [], f"Error extracting playlist: {e}"
+        finally:
+            timer.cancel()
+            proc.stdout.close()
+
+        if timed_out.is_set():
+            return [], f"Timeout extracting playlist: {playlist_url}"
+
+        if proc.returncode != 0:
+            stderr_file.seek(0)
+            return [], f"Error: {stderr_file.read().strip()}"
+
+        return videos, None
 
 
 def main():
@@ -94,37 +156,58 @@ def main():
 
     # Load current video list
     video_list_path = Path("scripts/ict-video-list.json")
-    with open(video_list_path, "r") as f:
-        video_list = json.load(f)
-
-    # Extract videos for each playlist
-    for playlist_key, playlist_info in PLAYLISTS.items():
-        print(f"📺 {playlist_info['name']}")
-        print("─" * 70)
-        print(f"Extracting from: {playlist_info['url']}")
-
-        videos = extract_playlist_videos(playlist_info["url"])
-
-        if videos:
-            print(f"✅ Found {len(videos)} videos")
-
-            # Update video list
-            if playlist_key in video_list["playlists"]:
-                playlist_data = video_list["playlists"][playlist_key]
-                playlist_data["videos"] = videos
-
-                print(f"✅ Updated playlist with {len(videos)} videos")
+    with open(video_list_path, "rb") as f:
+        video_list = _loads(f.read())
+
+    # Extract videos for all playlists concurrently (network-bound)
+    with ThreadPoolExecutor(max_workers=len(PLAYLISTS)) as executor:
+        futures = {
+            executor.submit(extract_playlist_videos, playlist_info["url"]): (playlist_key, playlist_info)
+            for playlist_key, playlist_info in PLAYLISTS.items()
+        }
+
+        for future in as_completed(futures):
+            playlist_key, playlist_info = futures[future]
+            videos, error = future.result()
+
+            # Buffer output per playlist so concurrent results don't interleave
+            lines = [
+                f"📺 {playlist_info['name']}",
+                "─" * 70,
+                f"Extracted from: {playlist_info['url']}",
+            ]
+
+            if error:
+                lines.append(error)
+
+            if videos:
+                lines.append(f"✅ Found {len(videos)} videos")
+
+                # Update video list
+                if playlist_key in video_list["playlists"]:
+                    playlist_data = video_list["playlists"][playlist_key]
+                    playlist_data["videos"] = videos
+
+                    lines.append(f"✅ Updated playlist with {len(videos)} videos")
+                else:
+                    lines.append(f"⚠️  Playlist '{playlist_key}' not found in video list")
             else:
-                print(f"⚠️  Playlist '{playlist_key}' not found in video list")
-        else:
-            print(f"❌ Failed to extract videos from {playlist_key}")
+                lines.append(f"❌ Failed to extract videos from {playlist_key}")
 
-        print()
+            print("\n".join(lines))
+            print()
 
     # Save updated video list
     print("💾 Saving updated video list...")
-    with open(video_list_path, "w") as f:
-        json.dump(video_list, f, indent=2)
+    # Write a sibling temp file and atomically swap it in, so an interrupted
+    # run never leaves a truncated video list behind
+    tmp_path = video_list_path.with_suffix(".json.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_dumpb(video_list, pretty=True))
+        os.replace(tmp_path, video_list_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     print(f"✅ Updated: {video_list_path}")
     print()
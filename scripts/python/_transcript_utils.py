@@ -0,0 +1,223 @@
+"""
+Shared helpers for the transcript scripts (transcript.py, transcript_tor.py).
+
+Covers JSON (de)serialization, output formatting, streaming batch mode, the
+on-disk transcript cache, video ID parsing, segment shaping and pause grouping. Fetching (and
+how the YouTubeTranscriptApi instance is configured) stays in each script.
+"""
+
+import io
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+
+# orjson is optional; fall back to the stdlib json module
+try:
+    import orjson
+
+    def _dumpb(obj, pretty: bool = False) -> bytes:
+        """Serialize to UTF-8 JSON bytes (compact unless pretty)."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    def _dumps(obj, pretty: bool = False) -> str:
+        """Serialize to JSON (compact unless pretty)."""
+        return _dumpb(obj, pretty).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj, pretty: bool = False) -> str:
+        """Serialize to JSON (compact unless pretty)."""
+        if pretty:
+            return json.dumps(obj, indent=2)
+        return json.dumps(obj, separators=(",", ":"))
+
+    def _dumpb(obj, pretty: bool = False) -> bytes:
+        """Serialize to UTF-8 JSON bytes (compact unless pretty)."""
+        return _dumps(obj, pretty).encode()
+
+    _loads = json.loads
+
+CACHE_DIR = Path.home() / ".cache" / "ict-kb" / "transcripts"
+
+
+# Bare video ID (11 characters, alphanumeric + _ -)
+_ID_RE = re.compile(r'^[a-zA-Z0-9_-]{11}$')
+
+# YouTube URL patterns (watch, /v/, youtu.be, embed, shorts) in one alternation
+_URL_RE = re.compile(r'(?:v=|/v/|youtu\.be/|embed/|shorts/)([a-zA-Z0-9_-]{11})')
+
+
+def extract_video_id(url_or_id: str) -> str:
+    """Extract video ID from YouTube URL or return as-is if already an ID."""
+    if _ID_RE.match(url_or_id):
+        return url_or_id
+
+    match = _URL_RE.search(url_or_id)
+    if match:
+        return match.group(1)
+
+    raise ValueError(f"Could not extract video ID from: {url_or_id}")
+
+
+def print_result(result: dict, jsonl: bool = False) -> None:
+    """Write a transcript result to stdout as a single JSON document or JSONL."""
+    if not jsonl or "segments" not in result:
+        print(_dumps(result))
+        return
+
+    # Tag every segment line so streaming consumers can attribute it when
+    # several videos are written back to back
+    video_id = result.get("videoId")
+    lines = [_dumps({"videoId": video_id, **seg}) for seg in result["segments"]]
+    lines.append(_dumps({k: v for k, v in result.items() if k != "segments"}))
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def run_batch_stream(fetch_line: Callable[[str, int], dict], max_workers: int) -> None:
+    """
+    Read video IDs/URLs from stdin (one per line) and write one JSON result
+    per line to stdout, flushing after each so callers can stream results.
+
+    Each non-empty line is submitted as soon as it is read, as
+    fetch_line(video_input, index), so a caller can wait for results before
+    closing stdin. Fetches run on max_workers threads and results are
+    written in completion order.
+    """
+    # Only batch mode needs the thread pool (and the logging import it pulls in)
+    from concurrent.futures import ThreadPoolExecutor
+
+    write_lock = threading.Lock()
+
+    def write_result(future) -> None:
+        line = _dumps(future.result()) + "\n"
+        with write_lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        index = 0
+        for line in sys.stdin:
+            video_input = line.strip()
+            if not video_input:
+                continue
+            future = executor.submit(fetch_line, video_input, index)
+            future.add_done_callback(write_result)
+            index += 1
+
+
+def _cache_path(video_id: str) -> Path:
+    """Path of the on-disk transcript cache entry for a video."""
+    return CACHE_DIR / f"{video_id}.json"
+
+
+def _read_cache(video_id: str) -> Optional[dict]:
+    """Return the cached transcript for a video, or None on miss/corrupt entry."""
+    try:
+        return _loads(_cache_path(video_id).read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(video_id: str, result: dict) -> None:
+    """Store a successful transcript result; cache failures are non-fatal."""
+    path = _cache_path(video_id)
+    # Unique per writer, so concurrent batch workers never share a temp file
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write to a sibling temp file and swap it in, so an interrupted run
+        # never leaves a truncated entry behind
+        tmp_path.write_bytes(_dumpb(result))
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def build_segments(segments) -> tuple[list[dict], str]:
+    """
+    Convert fetched transcript snippets into segment dicts and the full text,
+    in a single pass over the transcript.
+    """
+    out_segments = []
+    full_text = io.StringIO()
+    for seg in segments:
+        text = seg.text
+        if out_segments:
+            full_text.write(" ")
+        full_text.write(text)
+        out_segments.append({
+            "text": text,
+            "start": seg.start,
+            "duration": seg.duration
+        })
+
+    return out_segments, full_text.getvalue()
+
+
+@lru_cache(maxsize=4096)
+def _format_seconds(total_secs: int) -> str:
+    """Format whole seconds (memoized, timestamps repeat at second resolution)."""
+    hours, rem = divmod(total_secs, 3600)
+    minutes, secs = divmod(rem, 60)
+
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def format_timestamp(seconds: float) -> str:
+    """Convert seconds to HH:MM:SS or MM:SS format."""
+    return _format_seconds(int(seconds))
+
+
+def group_by_pauses(segments: list[dict], pause_threshold: float = 2.0) -> list[dict]:
+    """
+    Group transcript segments by natural pauses.
+    Useful for identifying topic shifts.
+    """
+    if not segments:
+        return []
+
+    groups = []
+    # Iterate without copying the list via segments[1:]
+    it = iter(segments)
+    first = next(it)
+    start = first["start"]
+    parts = [first["text"]]
+    prev_end = first["start"] + first["duration"]
+
+    for seg in it:
+        # Check for pause
+        gap = seg["start"] - prev_end
+
+        if gap >= pause_threshold:
+            # End current group, start new one
+            groups.append({
+                "start": start,
+                "text": " ".join(parts),
+                "timestamp": format_timestamp(start)
+            })
+            start = seg["start"]
+            parts = [seg["text"]]
+        else:
+            parts.append(seg["text"])
+
+        prev_end = seg["start"] + seg["duration"]
+
+    # Add final group
+    groups.append({
+        "start": start,
+        "text": " ".join(parts),
+        "timestamp": format_timestamp(start)
+    })
+
+    return groups
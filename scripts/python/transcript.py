@@ -5,39 +5,130 @@ Uses youtube-transcript-api to fetch transcripts with timestamps.
 
 Usage:
     python transcript.py <video_id_or_url>
+    python transcript.py <video_id_or_url> --grouped --no-cache
+    python transcript.py <video_id> <video_id> ...
+    python transcript.py --batch [--grouped] < video_ids.txt
+    python transcript.py <video_id_or_url> --jsonl
     python transcript.py --playlist <playlist_id>
 
-Output: JSON to stdout
+Successful fetches are cached in ~/.cache/ict-kb/transcripts/<video_id>.json
+and served from there on later runs unless --no-cache is given.
+
+Output: compact JSON to stdout (one document per line when several videos
+are given), or with --jsonl one line per segment (tagged with its videoId)
+followed by a final metadata line (the result without "segments"). --batch reads IDs from stdin
+and writes one JSON result per line (NDJSON), amortizing interpreter and
+import startup across many videos. Batch fetches run in parallel on
+TRANSCRIPT_WORKERS threads (default 4).
 """
 
+import os
 import sys
-import json
-import re
-from typing import Optional
+import threading
+
+from _transcript_utils import (
+    _dumps,
+    _read_cache,
+    _write_cache,
+    build_segments,
+    extract_video_id,
+    group_by_pauses,
+    print_result,
+    run_batch_stream,
+)
+
+# Lazily created YouTubeTranscriptApi instances, one set per thread and keyed
+# by use_cookies. The API class is not thread-safe, so batch workers must not
+# share an instance (or its requests.Session).
+_local = threading.local()
+
+
+def _get_api(use_cookies: bool = True):
+    """
+    Return this thread's YouTubeTranscriptApi for the given cookie config.
+
+    The instance (and its HTTP connection pool) is reused across videos
+    fetched on the same thread so keep-alive connections are not
+    re-established per fetch.
+    """
+    apis = getattr(_local, "apis", None)
+    if apis is None:
+        apis = _local.apis = {}
+    if use_cookies in apis:
+        return apis[use_cookies]
+
+    from youtube_transcript_api import YouTubeTranscriptApi
 
+    # Try with cookies first to avoid IP bans
+    cookies_path = os.path.expanduser("~/.youtube_cookies.txt")
 
-def extract_video_id(url_or_id: str) -> str:
-    """Extract video ID from YouTube URL or return as-is if already an ID."""
-    # Already a video ID (11 characters, alphanumeric + _ -)
-    if re.match(r'^[a-zA-Z0-9_-]{11}$', url_or_id):
-        return url_or_id
+    if use_cookies and os.path.exists(cookies_path):
+        # Use cookies file if available
+        api = YouTubeTranscriptApi(cookies=cookies_path)
+    else:
+        # Try without cookies - use browser cookies directly
+        try:
+            # Try Chrome cookies (most common browser)
+            api = YouTubeTranscriptApi(cookie_path="chrome")
+        except Exception:
+            # Fall back to no cookies
+            api = YouTubeTranscriptApi()
 
-    # YouTube URL patterns
-    patterns = [
-        r'(?:v=|/v/|youtu\.be/)([a-zA-Z0-9_-]{11})',
-        r'(?:embed/)([a-zA-Z0-9_-]{11})',
-        r'(?:shorts/)([a-zA-Z0-9_-]{11})',
-    ]
+    apis[use_cookies] = api
+    return api
 
-    for pattern in patterns:
-        match = re.search(pattern, url_or_id)
-        if match:
-            return match.group(1)
 
-    raise ValueError(f"Could not extract video ID from: {url_or_id}")
+def _fetch_with_api(api, video_id: str) -> dict:
+    """Fetch and shape a transcript using an existing API instance."""
+    segments = api.fetch(video_id)
 
+    out_segments, full_text = build_segments(segments)
+
+    return {
+        "videoId": video_id,
+        "language": "en",
+        "segments": out_segments,
+        "fullText": full_text
+    }
+
+
+def _fetch_with_retry(api, video_id: str) -> dict:
+    """
+    Fetch a transcript, retrying transient failures (rate limits / IP blocks,
+    failed YouTube requests, connection errors and timeouts) with exponential
+    backoff and jitter.
 
-def get_transcript(video_id: str, languages: list[str] = ['en'], use_cookies: bool = True) -> dict:
+    Anything else (unavailable or age-restricted video, no transcript, bad
+    ID, unparsable response, ...) cannot be fixed by a retry and is raised
+    immediately.
+    """
+    from requests.exceptions import ConnectionError, Timeout
+    from tenacity import (
+        Retrying,
+        retry_if_exception_type,
+        stop_after_attempt,
+        wait_exponential_jitter,
+    )
+    from youtube_transcript_api import RequestBlocked, YouTubeRequestFailed
+
+    retryer = Retrying(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        # IpBlocked subclasses RequestBlocked
+        retry=retry_if_exception_type(
+            (RequestBlocked, YouTubeRequestFailed, ConnectionError, Timeout)
+        ),
+        reraise=True,
+    )
+    return retryer(_fetch_with_api, api, video_id)
+
+
+def get_transcript(
+    video_id: str,
+    languages: list[str] = ['en'],
+    use_cookies: bool = True,
+    use_cache: bool = True,
+) -> dict:
     """
     Fetch transcript for a YouTube video.
 
@@ -51,43 +142,18 @@ def get_transcript(video_id: str, languages: list[str] = ['en'], use_cookies: bo
             "language": str
         }
     """
-    from youtube_transcript_api import YouTubeTranscriptApi
-    import os
+    if use_cache:
+        cached = _read_cache(video_id)
+        if cached is not None:
+            return cached
 
     try:
-        # Try with cookies first to avoid IP bans
-        cookies_path = os.path.expanduser("~/.youtube_cookies.txt")
-
-        if use_cookies and os.path.exists(cookies_path):
-            # Use cookies file if available
-            api = YouTubeTranscriptApi(cookies=cookies_path)
-        else:
-            # Try without cookies - use browser cookies directly
-            try:
-                # Try Chrome cookies (most common browser)
-                api = YouTubeTranscriptApi(cookie_path="chrome")
-            except Exception:
-                # Fall back to no cookies
-                api = YouTubeTranscriptApi()
-
-        segments = api.fetch(video_id)
-
-        # Build full text
-        full_text = " ".join([seg.text for seg in segments])
+        result = _fetch_with_retry(_get_api(use_cookies), video_id)
 
-        return {
-            "videoId": video_id,
-            "language": "en",
-            "segments": [
-                {
-                    "text": seg.text,
-                    "start": seg.start,
-                    "duration": seg.duration
-                }
-                for seg in segments
-            ],
-            "fullText": full_text
-        }
+        if use_cache:
+            _write_cache(video_id, result)
+
+        return result
 
     except Exception as e:
         return {
@@ -96,87 +162,82 @@ def get_transcript(video_id: str, languages: list[str] = ['en'], use_cookies: bo
         }
 
 
-def format_timestamp(seconds: float) -> str:
-    """Convert seconds to HH:MM:SS or MM:SS format."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-
-    if hours > 0:
-        return f"{hours}:{minutes:02d}:{secs:02d}"
-    return f"{minutes}:{secs:02d}"
-
-
-def group_by_pauses(segments: list[dict], pause_threshold: float = 2.0) -> list[dict]:
-    """
-    Group transcript segments by natural pauses.
-    Useful for identifying topic shifts.
-    """
-    if not segments:
-        return []
-
-    groups = []
-    current_group = {
-        "start": segments[0]["start"],
-        "texts": [segments[0]["text"]]
-    }
-
-    for i in range(1, len(segments)):
-        prev = segments[i - 1]
-        curr = segments[i]
+def _batch_one(video_input: str, grouped: bool, use_cache: bool) -> dict:
+    """Resolve and fetch a single batch entry, folding failures into the result."""
+    try:
+        video_id = extract_video_id(video_input)
+        result = get_transcript(video_id, use_cache=use_cache)
 
-        # Check for pause
-        prev_end = prev["start"] + prev["duration"]
-        gap = curr["start"] - prev_end
+        if "error" not in result and grouped:
+            result["grouped_segments"] = group_by_pauses(result["segments"])
+        return result
+    except Exception as e:
+        return {"videoId": video_input, "error": str(e)}
 
-        if gap >= pause_threshold:
-            # End current group
-            current_group["text"] = " ".join(current_group["texts"])
-            current_group["timestamp"] = format_timestamp(current_group["start"])
-            del current_group["texts"]
-            groups.append(current_group)
 
-            # Start new group
-            current_group = {
-                "start": curr["start"],
-                "texts": [curr["text"]]
-            }
-        else:
-            current_group["texts"].append(curr["text"])
+def _batch_workers() -> int:
+    """Worker count from TRANSCRIPT_WORKERS (default 4), clamped to at least 1."""
+    value = os.environ.get("TRANSCRIPT_WORKERS", "4")
+    try:
+        return max(1, int(value))
+    except ValueError:
+        raise ValueError(f"TRANSCRIPT_WORKERS must be an integer, got: {value!r}") from None
 
-    # Add final group
-    current_group["text"] = " ".join(current_group["texts"])
-    current_group["timestamp"] = format_timestamp(current_group["start"])
-    del current_group["texts"]
-    groups.append(current_group)
 
-    return groups
+def run_batch(grouped: bool = False, use_cache: bool = True, max_workers: int = 4) -> None:
+    """
+    Fetch video IDs/URLs read from stdin on max_workers threads, writing one
+    JSON result per line (NDJSON) in completion order, each tagged with its
+    videoId.
+    """
+    run_batch_stream(
+        lambda video_input, _index: _batch_one(video_input, grouped, use_cache),
+        max_workers,
+    )
 
 
 def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({
-            "error": "Usage: python transcript.py <video_id_or_url> [--grouped]"
+    grouped = "--grouped" in sys.argv
+    use_cache = "--no-cache" not in sys.argv
+    jsonl = "--jsonl" in sys.argv
+
+    if "--batch" in sys.argv:
+        try:
+            max_workers = _batch_workers()
+        except ValueError as e:
+            print(_dumps({"error": str(e)}))
+            sys.exit(1)
+        run_batch(grouped=grouped, use_cache=use_cache, max_workers=max_workers)
+        return
+
+    video_inputs = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not video_inputs:
+        print(_dumps({
+            "error": "Usage: python transcript.py <video_id_or_url>... [--grouped] [--no-cache] [--jsonl] | --batch"
         }))
         sys.exit(1)
 
-    video_input = sys.argv[1]
-    grouped = "--grouped" in sys.argv
+    failed = False
 
-    try:
-        video_id = extract_video_id(video_input)
-        result = get_transcript(video_id)
+    # One result per video; the API instance is reused across the loop
+    for video_input in video_inputs:
+        try:
+            video_id = extract_video_id(video_input)
+            result = get_transcript(video_id, use_cache=use_cache)
 
-        if "error" not in result and grouped:
-            result["grouped_segments"] = group_by_pauses(result["segments"])
+            if "error" not in result and grouped:
+                result["grouped_segments"] = group_by_pauses(result["segments"])
 
-        print(json.dumps(result, indent=2))
+            print_result(result, jsonl=jsonl)
 
-    except ValueError as e:
-        print(json.dumps({"error": str(e)}))
-        sys.exit(1)
-    except Exception as e:
-        print(json.dumps({"error": f"Unexpected error: {str(e)}"}))
+        except ValueError as e:
+            print(_dumps({"error": str(e)}))
+            failed = True
+        except Exception as e:
+            print(_dumps({"error": f"Unexpected error: {str(e)}"}))
+            failed = True
+
+    if failed:
         sys.exit(1)
 
 
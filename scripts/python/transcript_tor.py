@@ -4,75 +4,196 @@ YouTube transcript extraction via Tor proxy.
 Bypasses IP-based rate limiting by routing through Tor network.
 
 Usage:
-    python transcript_tor.py <video_id>
-
-Requires: Tor running on localhost:9050 (brew services start tor)
+    python transcript_tor.py <video_id>... [--no-cache] [--jsonl]
+    python transcript_tor.py --batch < video_ids.txt
+
+Output: compact JSON to stdout (one document per line when several videos
+are given), or with --jsonl one line per segment (tagged with its videoId)
+followed by a final metadata line (the result without "segments"). --batch reads IDs from stdin
+and writes one JSON result per line (NDJSON), fetching in parallel over
+TOR_CIRCUITS isolated Tor circuits (default 4).
+
+Requires: Tor running on localhost:9050 (brew services start tor) with
+ControlPort 9051 and CookieAuthentication enabled for identity rotation
+(or HashedControlPassword, with the password in TOR_CONTROL_PASSWORD).
 """
 
+import os
 import sys
-import json
+import threading
 import time
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.proxies import GenericProxyConfig
 
-# Tor SOCKS5 proxy (default port)
-TOR_PROXY = "socks5://127.0.0.1:9050"
+from _transcript_utils import (
+    _dumps,
+    _read_cache,
+    _write_cache,
+    build_segments,
+    group_by_pauses,
+    print_result,
+    run_batch_stream,
+)
+
+# Tor SOCKS5 proxy address (default port)
+TOR_SOCKS_ADDR = "127.0.0.1:9050"
+
+# Tor isolates streams by SOCKS credentials (IsolateSOCKSAuth, on by default),
+# so each distinct user:pass below gets its own circuit and exit IP from the
+# single Tor instance. Batch mode fetches over all of them in parallel.
+# Filled by main() from TOR_CIRCUITS (see _tor_circuits).
+TOR_PROXIES: list[str] = []
+
+# Tor control port (ControlPort in torrc) used for NEWNYM
+TOR_CONTROL_PORT = 9051
+
+# Lazily created API instances, one per Tor circuit, reused across videos.
+# The API class is not thread-safe, so each thread keeps its own set; they are
+# dropped when _identity_generation moves on (keep-alive connections would
+# otherwise stay on the pre-NEWNYM circuits).
+_local = threading.local()
+_identity_generation = 0
+# Circuits that hit a rate limit since the last NEWNYM
+_RATE_LIMITED: set = set()
+_POOL_LOCK = threading.Lock()
 
 def get_new_tor_identity():
-    """Request a new Tor circuit (new IP)"""
+    """Request a new Tor circuit (new IP) over an authenticated control connection"""
     try:
-        import socket
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect(("127.0.0.1", 9051))
-            s.send(b'AUTHENTICATE ""\r\n')
-            s.send(b'SIGNAL NEWNYM\r\n')
-            s.send(b'QUIT\r\n')
-        time.sleep(5)  # Wait for new circuit
+        import stem
+        import stem.connection
+        from stem import Signal
+        from stem.control import Controller
+    except ImportError as e:
+        print(f"Could not rotate Tor identity (stem not installed): {e}", file=sys.stderr)
+        return False
+
+    try:
+        with Controller.from_port(port=TOR_CONTROL_PORT) as controller:
+            # Cookie auth, or TOR_CONTROL_PASSWORD for HashedControlPassword
+            controller.authenticate(password=os.environ.get("TOR_CONTROL_PASSWORD"))
+            controller.signal(Signal.NEWNYM)
+            # stem tracks the NEWNYM it just sent on this controller and
+            # reports how long until Tor will honour the next one (~10s);
+            # wait that out so the fresh circuits are in place before retrying
+            time.sleep(controller.get_newnym_wait())
         return True
-    except:
+    except (stem.ControllerError, stem.connection.AuthenticationFailure) as e:
+        print(f"Could not rotate Tor identity: {e}", file=sys.stderr)
         return False
 
-def fetch_transcript_via_tor(video_id: str, max_retries: int = 3) -> dict:
-    """Fetch transcript using Tor proxy with retry logic"""
+def _tor_circuits() -> int:
+    """Circuit count from TOR_CIRCUITS (default 4), clamped to at least 1"""
+    value = os.environ.get("TOR_CIRCUITS", "4")
+    try:
+        return max(1, int(value))
+    except ValueError:
+        raise ValueError(f"TOR_CIRCUITS must be an integer, got: {value!r}") from None
+
+def configure_circuits(circuits: int) -> None:
+    """Build TOR_PROXIES with one set of SOCKS credentials per circuit"""
+    TOR_PROXIES[:] = [f"socks5://circuit{i}:ict@{TOR_SOCKS_ADDR}" for i in range(circuits)]
+
+def _get_api(proxy_url: str):
+    """Return this thread's YouTubeTranscriptApi for a Tor circuit, creating it on first use"""
+    if getattr(_local, "generation", None) != _identity_generation:
+        _local.generation = _identity_generation
+        _local.apis = {}
+
+    apis = _local.apis
+    if proxy_url not in apis:
+        # Imported only on a cache miss, so cached and usage/error paths skip it
+        from youtube_transcript_api import YouTubeTranscriptApi
+        from youtube_transcript_api.proxies import GenericProxyConfig
+
+        proxy_config = GenericProxyConfig(
+            http_url=proxy_url,
+            https_url=proxy_url
+        )
+        apis[proxy_url] = YouTubeTranscriptApi(proxy_config=proxy_config)
+    return apis[proxy_url]
+
+def _mark_rate_limited(proxy_url: str, exhausted: bool = False) -> bool:
+    """
+    Record a rate-limited circuit and request a new Tor identity once every
+    circuit is limited, or when the caller has run out of circuits to try
+    (exhausted). Returns True if NEWNYM was requested.
+    """
+    global _identity_generation
+    with _POOL_LOCK:
+        _RATE_LIMITED.add(proxy_url)
+        if not exhausted and len(_RATE_LIMITED) < len(TOR_PROXIES):
+            return False
+        _RATE_LIMITED.clear()
+        # Keep-alive connections stay on the old circuits
+        _identity_generation += 1
+
+    print("Tor circuits rate limited, requesting new Tor identity...", file=sys.stderr)
+    get_new_tor_identity()
+    return True
+
+def _fetch_with_api(api, video_id: str) -> dict:
+    """Fetch and shape a transcript using an existing API instance"""
+    segments = api.fetch(video_id)
+
+    out_segments, full_text = build_segments(segments)
+
+    # Group segments by pauses for better chunking
+    grouped = group_by_pauses(out_segments)
+
+    return {
+        "videoId": video_id,
+        "language": "en",
+        "segments": out_segments,
+        "groupedSegments": grouped,
+        "fullText": full_text
+    }
+
+def fetch_transcript_via_tor(
+    video_id: str,
+    max_retries: int = 3,
+    use_cache: bool = True,
+    circuit: int = 0,
+) -> dict:
+    """Fetch transcript using Tor proxy with retry logic, moving to the next circuit on rate limits"""
+    if use_cache:
+        cached = _read_cache(video_id)
+        if cached is not None:
+            # Entries written by transcript.py carry no grouping
+            if "groupedSegments" not in cached:
+                cached["groupedSegments"] = group_by_pauses(cached.get("segments", []))
+            return cached
+
+    # Imported callers that skip main() get the TOR_CIRCUITS default
+    if not TOR_PROXIES:
+        configure_circuits(_tor_circuits())
+
+    # Circuits this call hit a rate limit on since its last NEWNYM. A call can
+    # only hop across min(circuits, retries) of them before its final attempt,
+    # so once those are all limited it requests a new identity itself.
+    limited = set()
+    hop_limit = max(1, min(len(TOR_PROXIES), max_retries - 1))
 
     for attempt in range(max_retries):
+        proxy_url = TOR_PROXIES[(circuit + attempt) % len(TOR_PROXIES)]
         try:
-            # Configure proxy
-            proxy_config = GenericProxyConfig(
-                http_url=TOR_PROXY,
-                https_url=TOR_PROXY
-            )
-
-            api = YouTubeTranscriptApi(proxy_config=proxy_config)
-            segments = api.fetch(video_id)
-
-            # Build full text
-            full_text = " ".join([seg.text for seg in segments])
-
-            # Group segments by pauses for better chunking
-            grouped = group_by_pauses([
-                {"text": seg.text, "start": seg.start, "duration": seg.duration}
-                for seg in segments
-            ])
-
-            return {
-                "videoId": video_id,
-                "language": "en",
-                "segments": [
-                    {"text": seg.text, "start": seg.start, "duration": seg.duration}
-                    for seg in segments
-                ],
-                "groupedSegments": grouped,
-                "fullText": full_text
-            }
+            result = _fetch_with_api(_get_api(proxy_url), video_id)
+
+            with _POOL_LOCK:
+                _RATE_LIMITED.discard(proxy_url)
+
+            if use_cache:
+                _write_cache(video_id, result)
+
+            return result
 
         except Exception as e:
             error_msg = str(e)
             if "429" in error_msg or "blocked" in error_msg.lower() or "could not retrieve" in error_msg.lower():
-                # Rate limited, get new Tor identity and retry
+                # Rate limited, retry on the next circuit (new identity once all are limited)
                 if attempt < max_retries - 1:
-                    print(f"Rate limited, requesting new Tor identity (attempt {attempt + 2}/{max_retries})...", file=sys.stderr)
-                    get_new_tor_identity()
+                    print(f"Rate limited, retrying on another Tor circuit (attempt {attempt + 2}/{max_retries})...", file=sys.stderr)
+                    limited.add(proxy_url)
+                    if _mark_rate_limited(proxy_url, exhausted=len(limited) >= hop_limit):
+                        limited.clear()
                     time.sleep(2)
                     continue
 
@@ -80,63 +201,44 @@ def fetch_transcript_via_tor(video_id: str, max_retries: int = 3) -> dict:
 
     return {"videoId": video_id, "error": "All retries failed"}
 
-def format_timestamp(seconds: float) -> str:
-    """Convert seconds to MM:SS or HH:MM:SS format"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-
-    if hours > 0:
-        return f"{hours}:{minutes:02d}:{secs:02d}"
-    return f"{minutes}:{secs:02d}"
-
-def group_by_pauses(segments: list, pause_threshold: float = 2.0) -> list:
-    """Group transcript segments by natural pauses"""
-    if not segments:
-        return []
-
-    groups = []
-    current_group = {
-        "start": segments[0]["start"],
-        "texts": [segments[0]["text"]]
-    }
-
-    for i in range(1, len(segments)):
-        prev = segments[i - 1]
-        curr = segments[i]
-
-        prev_end = prev["start"] + prev["duration"]
-        gap = curr["start"] - prev_end
-
-        if gap >= pause_threshold:
-            current_group["text"] = " ".join(current_group["texts"])
-            current_group["timestamp"] = format_timestamp(current_group["start"])
-            del current_group["texts"]
-            groups.append(current_group)
+def _batch_one(video_id: str, use_cache: bool, circuit: int) -> dict:
+    """Fetch a single batch entry, folding failures into the result"""
+    try:
+        return fetch_transcript_via_tor(video_id, use_cache=use_cache, circuit=circuit)
+    except Exception as e:
+        return {"videoId": video_id, "error": str(e)}
+
+def run_batch(use_cache: bool = True) -> None:
+    """Fetch video IDs read from stdin over the Tor circuits, one JSON result per line"""
+    # One worker per Tor circuit; videos are spread round-robin across circuits
+    run_batch_stream(
+        lambda video_id, index: _batch_one(video_id, use_cache, index % len(TOR_PROXIES)),
+        len(TOR_PROXIES),
+    )
 
-            current_group = {
-                "start": curr["start"],
-                "texts": [curr["text"]]
-            }
-        else:
-            current_group["texts"].append(curr["text"])
+def main():
+    use_cache = "--no-cache" not in sys.argv
+    jsonl = "--jsonl" in sys.argv
 
-    # Add final group
-    current_group["text"] = " ".join(current_group["texts"])
-    current_group["timestamp"] = format_timestamp(current_group["start"])
-    del current_group["texts"]
-    groups.append(current_group)
+    try:
+        configure_circuits(_tor_circuits())
+    except ValueError as e:
+        print(_dumps({"error": str(e)}))
+        sys.exit(1)
 
-    return groups
+    if "--batch" in sys.argv:
+        run_batch(use_cache=use_cache)
+        return
 
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({"error": "Usage: python transcript_tor.py <video_id>"}))
+    video_ids = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not video_ids:
+        print(_dumps({"error": "Usage: python transcript_tor.py <video_id>... [--no-cache] [--jsonl] | --batch"}))
         sys.exit(1)
 
-    video_id = sys.argv[1]
-    result = fetch_transcript_via_tor(video_id)
-    print(json.dumps(result, indent=2))
+    # One result per video; the Tor-proxied API is shared across the loop
+    for video_id in video_ids:
+        result = fetch_transcript_via_tor(video_id, use_cache=use_cache)
+        print_result(result, jsonl=jsonl)
 
 if __name__ == "__main__":
     main()